@@ -9,24 +9,29 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import plotly.graph_objects as go
 
 # Add parent directory to path
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.polygon_api import PolygonOptionsAPI
+from utils.polygon_api import PolygonOptionsAPI, count_complete
 
 # Load environment variables
 load_dotenv()
 
+@lru_cache(maxsize=4096)
+def _parse_date(date_string: str):
+    """Parse a YYYY-MM-DD string into a date object (cached per string)."""
+    return datetime.strptime(date_string, '%Y-%m-%d').date()
+
 def date_difference_days(date_string: str, reference_date) -> int:
     """Calculate days between a date string and a date object."""
-    target_date = datetime.strptime(date_string, '%Y-%m-%d').date()
     if isinstance(reference_date, datetime):
         reference_date = reference_date.date()
-    return (target_date - reference_date).days
+    return _parse_date(date_string).toordinal() - reference_date.toordinal()
 
 # Configuration
 API_KEY = os.getenv('POLYGON_API_KEY')
@@ -47,6 +52,50 @@ def get_api_client():
         st.sidebar.warning("Using REST API only (no S3)")
         return PolygonOptionsAPI(API_KEY)
 
+class EmptyFetch(Exception):
+    """Raised by a cached fetch that came back empty, carrying the result.
+    
+    Streamlit doesn't cache calls that raise, so a transient failure (no
+    price, no expirations, empty chain) is retried on the next rerun instead
+    of being served to every session until the TTL runs out.
+    """
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+def fetch_uncached_if_empty(fetch, *args):
+    """Call a cached fetch, returning its result even when it wasn't cached"""
+    try:
+        return fetch(*args)
+    except EmptyFetch as e:
+        return e.result
+
+# Cached API calls - widget changes rerun the script without re-hitting Polygon.
+# The client argument is underscored so Streamlit doesn't try to hash it.
+# Call these through fetch_uncached_if_empty.
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_price_and_expirations(_api, ticker: str, as_of_date: str):
+    """Stock price (previous close as fallback) and expirations.
+    
+    The price and expiration lookups are independent, so they run
+    concurrently instead of paying for each round trip in turn. The previous
+    close is only requested if there is no price for the day.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        price = executor.submit(_api.get_stock_price, ticker, as_of_date)
+        expirations = executor.submit(_api.get_available_expirations, ticker, as_of_date)
+        result = (price.result() or _api.get_previous_close(ticker), expirations.result())
+    if not all(result):
+        raise EmptyFetch(result)
+    return result
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_option_chain(_api, ticker: str, expiration: str, as_of_date: str):
+    chain = _api.get_option_chain(ticker, expiration, as_of_date)
+    if chain.empty:
+        raise EmptyFetch(chain)
+    return chain
+
 # Page config
 st.set_page_config(
     page_title="Historical Options Chain Viewer",
@@ -70,45 +119,440 @@ if 'last_params' not in st.session_state:
     st.session_state.last_params = {}
 
 # Helper functions
-def format_number(value):
+def format_number(values):
     """Format large numbers with commas"""
-    if pd.isna(value) or value == 0:
-        return '-'
-    try:
-        return f"{int(value):,}"
-    except:
-        return '-'
+    missing = values.isna() | (values == 0)
+    return values.fillna(0).astype('int64').map('{:,}'.format).mask(missing, '-')
 
-def format_price(value):
+def format_price(values):
     """Format price values"""
-    if pd.isna(value) or value is None:
-        return '-'
-    try:
-        return f"{float(value):.2f}"
-    except:
-        return '-'
+    numbers = pd.to_numeric(values, errors='coerce')
+    return numbers.map('{:.2f}'.format).mask(numbers.isna(), '-')
 
-def format_change(value):
+def format_change(values):
     """Format change values with + or - sign"""
-    if pd.isna(value) or value is None:
-        return '-'
-    try:
-        val = float(value)
-        if val > 0:
-            return f"+{val:.2f}"
-        else:
-            return f"{val:.2f}"
-    except:
-        return '-'
+    numbers = pd.to_numeric(values, errors='coerce')
+    formatted = numbers.map('{:.2f}'.format)
+    formatted = formatted.mask(numbers > 0, '+' + formatted)
+    return formatted.mask(numbers.isna(), '-')
 
-def format_greek(value):
+def format_greek(values):
     """Format Greek values"""
-    if pd.isna(value) or value is None:
-        return '-'
-    try:
-        return f"{float(value):.3f}"
-    except:
-        return '-'
+    numbers = pd.to_numeric(values, errors='coerce')
+    return numbers.map('{:.3f}'.format).mask(numbers.isna(), '-')
+
+def nearest_strike_index(strikes, price) -> int:
+    """Index of the strike closest to price in a sorted strike array (lower strike on ties)"""
+    idx = int(np.searchsorted(strikes, price))
+    if idx == len(strikes):
+        return idx - 1
+    if idx > 0 and price - strikes[idx - 1] <= strikes[idx] - price:
+        return idx - 1
+    return idx
+
+def chain_column(frame, column):
+    """Get a column from a strike-indexed frame, all missing if absent"""
+    if column in frame.columns:
+        return frame[column]
+    return pd.Series(np.nan, index=frame.index)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def chain_strikes(chain_key: tuple, _option_chain) -> np.ndarray:
+    """Sorted unique strikes, shared by the page and the debug panel.
+    
+    Cached on chain_key (ticker, date, expiration); the frame is not hashed.
+    """
+    return np.sort(_option_chain['strike'].unique())
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def prepare_option_chain(chain_key: tuple, _option_chain):
+    """Split an option chain into the pieces the page renders from.
+    
+    Cached on chain_key (ticker, date, expiration) so changing display
+    settings only re-slices the strike window. Returns a dict with the sorted
+    strikes, strike-indexed calls/puts, the most active contracts and totals.
+    """
+    # Split into calls and puts in a single pass
+    by_type = dict(tuple(_option_chain.groupby('type', sort=False, observed=True)))
+    calls = by_type.get('call', _option_chain.iloc[:0])
+    puts = by_type.get('put', _option_chain.iloc[:0])
+
+    # Volume and open interest per side in one grouped pass
+    sums = (_option_chain.groupby('type', sort=False, observed=True)[['volume', 'open_interest']].sum()
+            .reindex(['call', 'put'], fill_value=0))
+
+    return {
+        'strikes': chain_strikes(chain_key, _option_chain),
+        # Index by strike so the displayed window is a direct lookup
+        'calls_by_strike': calls.drop_duplicates('strike').set_index('strike'),
+        'puts_by_strike': puts.drop_duplicates('strike').set_index('strike'),
+        'active_calls': calls.nlargest(5, 'volume'),
+        'active_puts': puts.nlargest(5, 'volume'),
+        'totals': {
+            'call_volume': int(sums.at['call', 'volume']),
+            'call_oi': int(sums.at['call', 'open_interest']),
+            'put_volume': int(sums.at['put', 'volume']),
+            'put_oi': int(sums.at['put', 'open_interest']),
+        },
+    }
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_chain_table(chain_key: tuple, _calls_by_strike, _puts_by_strike, display_strikes: tuple,
+                      stock_price: float, atm_strike: float, show_greeks: bool) -> pd.DataFrame:
+    """Build the formatted option chain table with highlight metadata columns.
+    
+    Cached on chain_key (ticker, date, expiration) plus the display settings;
+    the strike-indexed frames are not hashed.
+    """
+    # Align calls and puts onto the displayed strikes, highest first
+    table_strikes = np.array(sorted(display_strikes, reverse=True), dtype=float)
+    calls_v = _calls_by_strike.reindex(table_strikes)
+    puts_v = _puts_by_strike.reindex(table_strikes)
+
+    # Calculate moneyness for all strikes at once
+    moneyness = (stock_price - table_strikes) / stock_price * 100
+
+    # Build columns based on display settings
+    option_chain_data = {
+        'OI (C)': format_number(chain_column(calls_v, 'open_interest')),
+        'Volume (C)': format_number(chain_column(calls_v, 'volume')),
+        'Bid (C)': format_price(chain_column(calls_v, 'bid')),
+        'Ask (C)': format_price(chain_column(calls_v, 'ask')),
+        'Last (C)': format_price(chain_column(calls_v, 'last')),
+    }
+
+    # Add Greeks if enabled and available
+    if show_greeks:
+        option_chain_data['Δ (C)'] = format_greek(chain_column(calls_v, 'delta'))
+        option_chain_data['IV (C)'] = format_greek(chain_column(calls_v, 'implied_volatility'))
+
+    # Add strike info
+    option_chain_data['Strike'] = pd.Series(table_strikes).map('${:,.0f}'.format)
+    option_chain_data['%'] = pd.Series(moneyness).map('{:+.1f}%'.format)
+
+    # Add put data
+    option_chain_data['Last (P)'] = format_price(chain_column(puts_v, 'last'))
+    option_chain_data['Ask (P)'] = format_price(chain_column(puts_v, 'ask'))
+    option_chain_data['Bid (P)'] = format_price(chain_column(puts_v, 'bid'))
+
+    # Add put Greeks if enabled
+    if show_greeks:
+        option_chain_data['IV (P)'] = format_greek(chain_column(puts_v, 'implied_volatility'))
+        option_chain_data['Δ (P)'] = format_greek(chain_column(puts_v, 'delta'))
+
+    option_chain_data['Volume (P)'] = format_number(chain_column(puts_v, 'volume'))
+    option_chain_data['OI (P)'] = format_number(chain_column(puts_v, 'open_interest'))
+
+    # Create DataFrame (one column per key, positional index)
+    df = pd.DataFrame({col: np.asarray(values) for col, values in option_chain_data.items()})
+
+    # Add metadata for highlighting
+    df['_strike_val'] = table_strikes
+    df['_is_atm'] = np.abs(table_strikes - atm_strike) < 0.01
+    df['_is_call_itm'] = table_strikes < stock_price
+    df['_is_put_itm'] = table_strikes > stock_price
+    
+    return df
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def summarize_option_chain(chain_key: tuple, _option_chain) -> dict:
+    """Collect the strike, source and coverage stats shown in the debug panel.
+    
+    Cached on chain_key (ticker, date, expiration); the frame is not hashed.
+    Keys are only present when the chain has the columns they are built from.
+    """
+    summary = {}
+    if 'strike' in _option_chain.columns:
+        summary['strikes'] = chain_strikes(chain_key, _option_chain).tolist()
+    if 'data_source' in _option_chain.columns:
+        summary['source_counts'] = (_option_chain['data_source'].value_counts()
+                                    .rename_axis('source').rename('options').to_frame())
+        summary['has_s3_source'] = 's3_flatfiles' in summary['source_counts'].index
+    if 'delta' in _option_chain.columns:
+        summary['greeks_n'] = count_complete(_option_chain, ['delta'])
+    if 'bid' in _option_chain.columns and 'ask' in _option_chain.columns:
+        summary['quotes_n'] = count_complete(_option_chain, ['bid', 'ask'])
+    return summary
+
+def strike_last_price(by_strike, strike):
+    """Last trade for a strike in a strike-indexed frame, None if not listed"""
+    if 'last' not in by_strike.columns or strike not in by_strike.index:
+        return None
+    return by_strike.at[strike, 'last']
+
+def format_active_options(active, show_greeks):
+    """Build the summary line for each contract in a most-active table"""
+    # Quote if both sides are present, otherwise fall back to last trade
+    last = active['last'].astype(str) if 'last' in active.columns else pd.Series('N/A', index=active.index)
+    bid_ask = 'Last: $' + last
+    if 'bid' in active.columns and 'ask' in active.columns:
+        has_quote = active['bid'].notna() & active['ask'].notna()
+        quotes = 'Bid: $' + format_price(active['bid']) + ', Ask: $' + format_price(active['ask'])
+        bid_ask = bid_ask.mask(has_quote, quotes)
+    
+    greeks = pd.Series('', index=active.index)
+    if show_greeks and 'delta' in active.columns:
+        iv = active['implied_volatility'] if 'implied_volatility' in active.columns else pd.Series(0.0, index=active.index)
+        greek_text = ' | Δ=' + format_greek(active['delta']) + ', IV=' + iv.map('{:.3f}'.format)
+        greeks = greeks.mask(active['delta'].notna(), greek_text)
+    
+    lines = ('$' + active['strike'].map('{:.0f}'.format) + ' Strike: Vol='
+             + active['volume'].map('{:,}'.format) + ', ' + bid_ask + greeks)
+    return lines.tolist()
+
+@st.fragment
+def credit_spread_calculator(prepared):
+    """Credit spread calculator and P&L diagram.
+    
+    Runs as a fragment, so changing its inputs reruns only the calculator
+    instead of the whole page.
+    """
+    with st.expander("Credit Spread Calculator", expanded=True):
+        st.markdown("### Option Spread Analysis")
+        
+        # Get available strikes and premiums from option chain if available
+        if 'option_chain' in st.session_state and st.session_state.option_chain is not None and not st.session_state.option_chain.empty:
+            available_strikes = prepared['strikes'].tolist()
+            
+            # Find default strikes for spread
+            current_price = st.session_state.current_stock_price or 100
+            atm_idx = nearest_strike_index(prepared['strikes'], current_price)
+            
+            # Default to 5 strikes OTM for each leg
+            sell_idx = min(atm_idx + 5, len(available_strikes) - 1)
+            buy_idx = min(atm_idx + 10, len(available_strikes) - 1)
+            
+            default_sell_strike = available_strikes[sell_idx]
+            default_buy_strike = available_strikes[buy_idx]
+            
+            # Strike-indexed legs from the prepared chain, keyed by option type
+            legs_by_type = {'call': prepared['calls_by_strike'], 'put': prepared['puts_by_strike']}
+            
+            # Get last prices for defaults
+            sell_call_last = strike_last_price(legs_by_type['call'], default_sell_strike)
+            buy_call_last = strike_last_price(legs_by_type['call'], default_buy_strike)
+            
+            default_sell_premium = sell_call_last if sell_call_last is not None else 2.0
+            default_buy_premium = buy_call_last if buy_call_last is not None else 0.5
+        else:
+            # Fallback values if no option chain loaded
+            available_strikes = []
+            default_sell_strike = 100.0
+            default_buy_strike = 105.0
+            default_sell_premium = 2.0
+            default_buy_premium = 0.5
+        
+        calc_col1, calc_col2, calc_col3 = st.columns([2, 2, 1])
+        
+        with calc_col1:
+            st.markdown("**Sell Leg (Short)**")
+            sell_type = st.radio("Type", ["Call", "Put"], key="sell_type", horizontal=True)
+            
+            if available_strikes:
+                sell_strike = st.selectbox("Strike Price", options=available_strikes, 
+                                         index=sell_idx, 
+                                         key="sell_strike")
+                # Get premium for selected strike
+                sell_last = strike_last_price(legs_by_type[sell_type.lower()], sell_strike)
+                if sell_last is not None and sell_last > 0:
+                    sell_premium = st.number_input("Premium Received", 
+                                                 value=float(sell_last), 
+                                                 step=0.05, key="sell_premium")
+                else:
+                    sell_premium = st.number_input("Premium Received", value=default_sell_premium, 
+                                                 step=0.05, key="sell_premium")
+            else:
+                sell_strike = st.number_input("Strike Price", min_value=0.0, value=default_sell_strike, 
+                                            step=0.5, key="sell_strike")
+                sell_premium = st.number_input("Premium Received", min_value=0.0, value=default_sell_premium, 
+                                             step=0.05, key="sell_premium")
+        
+        with calc_col2:
+            st.markdown("**Buy Leg (Long)**")
+            buy_type = st.radio("Type", ["Call", "Put"], key="buy_type", horizontal=True)
+            
+            if available_strikes:
+                buy_strike = st.selectbox("Strike Price", options=available_strikes, 
+                                        index=buy_idx, 
+                                        key="buy_strike")
+                # Get premium for selected strike
+                buy_last = strike_last_price(legs_by_type[buy_type.lower()], buy_strike)
+                if buy_last is not None and buy_last > 0:
+                    buy_premium = st.number_input("Premium Paid", 
+                                                value=float(buy_last), 
+                                                step=0.05, key="buy_premium")
+                else:
+                    buy_premium = st.number_input("Premium Paid", value=default_buy_premium, 
+                                                step=0.05, key="buy_premium")
+            else:
+                buy_strike = st.number_input("Strike Price", min_value=0.0, value=default_buy_strike, 
+                                           step=0.5, key="buy_strike")
+                buy_premium = st.number_input("Premium Paid", min_value=0.0, value=default_buy_premium, 
+                                            step=0.05, key="buy_premium")
+        
+        with calc_col3:
+            st.markdown("**Analysis**")
+            contracts = st.number_input("# Contracts", min_value=1, value=1, step=1)
+        
+        if st.button("Calculate Spread", type="primary"):
+            # Validate spread type
+            if sell_type == buy_type:
+                # Credit spread calculation
+                net_credit = sell_premium - buy_premium
+                max_profit = net_credit * 100 * contracts
+                
+                if sell_type == "Call":
+                    # Call Credit Spread (Bear Call Spread)
+                    if sell_strike < buy_strike:
+                        spread_width = buy_strike - sell_strike
+                        max_loss = (spread_width - net_credit) * 100 * contracts
+                        breakeven = sell_strike + net_credit
+                        spread_name = "Bear Call Spread"
+                        valid_spread = True
+                    else:
+                        st.error("For a Call Credit Spread, sell strike must be lower than buy strike")
+                        valid_spread = False
+                else:
+                    # Put Credit Spread (Bull Put Spread)  
+                    if sell_strike > buy_strike:
+                        spread_width = sell_strike - buy_strike
+                        max_loss = (spread_width - net_credit) * 100 * contracts
+                        breakeven = sell_strike - net_credit
+                        spread_name = "Bull Put Spread"
+                        valid_spread = True
+                    else:
+                        st.error("For a Put Credit Spread, sell strike must be higher than buy strike")
+                        valid_spread = False
+                
+                # Display results
+                if valid_spread:
+                    result_col1, result_col2 = st.columns(2)
+                    
+                    with result_col1:
+                        st.success(f"**{spread_name}**")
+                        st.metric("Net Credit", f"${net_credit:.2f}")
+                        st.metric("Max Profit", f"${max_profit:.2f}")
+                        st.metric("Max Loss", f"-${abs(max_loss):.2f}")
+                        st.metric("Breakeven", f"${breakeven:.2f}")
+                        
+                        if max_loss != 0:
+                            risk_reward = abs(max_profit / max_loss)
+                            st.metric("Risk/Reward Ratio", f"1:{risk_reward:.2f}")
+                    
+                    with result_col2:
+                        # Create P&L diagram
+                        if st.session_state.current_stock_price:
+                            current_price = st.session_state.current_stock_price
+                            price_range = np.linspace(
+                                min(sell_strike, buy_strike) * 0.9,
+                                max(sell_strike, buy_strike) * 1.1,
+                                100
+                            )
+                            
+                            if sell_type == "Call":
+                                # Bear Call Spread P&L
+                                sell_intrinsic = np.maximum(0, price_range - sell_strike)
+                                buy_intrinsic = np.maximum(0, price_range - buy_strike)
+                            else:  # Put
+                                # Bull Put Spread P&L
+                                sell_intrinsic = np.maximum(0, sell_strike - price_range)
+                                buy_intrinsic = np.maximum(0, buy_strike - price_range)
+                            pnl = (net_credit - sell_intrinsic + buy_intrinsic) * 100 * contracts
+                            
+                            # Create plot - plotly is only imported once a spread is calculated
+                            import plotly.graph_objects as go
+                            fig = go.Figure()
+                            
+                            # Add P&L line (WebGL trace keeps redraws cheap on interaction)
+                            fig.add_trace(go.Scattergl(
+                                x=price_range,
+                                y=pnl,
+                                mode='lines',
+                                name='P&L',
+                                line=dict(color='blue', width=3)
+                            ))
+                            
+                            # Shapes and annotations are collected here and handed to the layout in
+                            # one update instead of one add_* call (and layout validation) each.
+                            # Shaded regions go first so they appear behind everything.
+                            span_x = dict(type="line", xref="x domain", x0=0, x1=1, yref="y")
+                            span_y = dict(type="line", xref="x", yref="y domain", y0=0, y1=1)
+                            shapes = [
+                                dict(type="rect", xref="x domain", x0=0, x1=1, yref="y", y0=0, y1=max_profit,
+                                     fillcolor="green", opacity=0.1),
+                                dict(type="rect", xref="x domain", x0=0, x1=1, yref="y", y0=-abs(max_loss), y1=0,
+                                     fillcolor="red", opacity=0.1),
+                                # Horizontal lines without annotations (text is added separately)
+                                dict(span_x, y0=0, y1=0, line=dict(dash="dash", color="gray", width=1)),
+                                dict(span_x, y0=max_profit, y1=max_profit, line=dict(dash="dot", color="green", width=2)),
+                                dict(span_x, y0=-abs(max_loss), y1=-abs(max_loss), line=dict(dash="dot", color="red", width=2)),
+                                # Vertical lines for breakeven and current price
+                                dict(span_y, x0=breakeven, x1=breakeven, line=dict(dash="dash", color="orange", width=2)),
+                            ]
+                            if current_price:
+                                shapes.append(dict(span_y, x0=current_price, x1=current_price,
+                                                   line=dict(dash="dash", color="green", width=2)))
+                            
+                            # Text annotations positioned inside the plot area
+                            # Position annotations at 95% of the x-axis range to keep them inside
+                            x_pos_right = price_range[-1] - (price_range[-1] - price_range[0]) * 0.05
+                            x_pos_left = price_range[0] + (price_range[-1] - price_range[0]) * 0.05
+                            label_box = dict(bgcolor="rgba(255, 255, 255, 0.8)", borderwidth=1)
+                            marker_arrow = dict(showarrow=True, arrowhead=2, arrowsize=1, arrowwidth=2, ax=0, ay=-30)
+                            annotations = [
+                                # Max Profit / Max Loss levels
+                                dict(label_box, x=x_pos_right, y=max_profit, text=f"Max Profit: ${max_profit:.2f}",
+                                     showarrow=False, bordercolor="green", font=dict(color="green", size=12),
+                                     xanchor="right", yanchor="middle"),
+                                dict(label_box, x=x_pos_right, y=-abs(max_loss), text=f"Max Loss: ${abs(max_loss):.2f}",
+                                     showarrow=False, bordercolor="red", font=dict(color="red", size=12),
+                                     xanchor="right", yanchor="middle"),
+                                # Breakeven, 80% up the chart
+                                dict(label_box, **marker_arrow, x=breakeven, y=max_profit * 0.8, text=f"BE: ${breakeven:.2f}",
+                                     arrowcolor="orange", bordercolor="orange", font=dict(color="orange", size=12)),
+                            ]
+                            if current_price:
+                                # Current price, 60% up the chart
+                                annotations.append(dict(label_box, **marker_arrow, x=current_price, y=max_profit * 0.6,
+                                                        text=f"Current: ${current_price:.2f}", arrowcolor="green",
+                                                        bordercolor="green", font=dict(color="green", size=12)))
+                            
+                            # Update layout with proper margins and y-axis range
+                            y_range_buffer = abs(max_loss) * 0.1  # 10% buffer
+                            
+                            fig.update_layout(
+                                shapes=shapes,
+                                annotations=annotations,
+                                title=f"{spread_name} P&L Diagram",
+                                xaxis_title="Stock Price",
+                                yaxis_title="Profit/Loss ($)",
+                                height=450,  # Slightly taller for better visibility
+                                showlegend=True,
+                                hovermode='x unified',
+                                margin=dict(l=80, r=80, t=80, b=60),  # Balanced margins
+                                yaxis=dict(
+                                    range=[-abs(max_loss) - y_range_buffer, max_profit + y_range_buffer]
+                                ),
+                                xaxis=dict(
+                                    range=[price_range[0], price_range[-1]]
+                                )
+                            )
+                            
+                            st.plotly_chart(fig, use_container_width=True)
+                            
+                            # Add legend explanation
+                            st.markdown("**Chart Legend:**")
+                            legend_col1, legend_col2 = st.columns(2)
+                            with legend_col1:
+                                st.markdown("- **Blue Line**: P&L at expiration")
+                                st.markdown("- **Orange Dashed**: Breakeven price")
+                                st.markdown("- **Green Dashed**: Current stock price")
+                            with legend_col2:
+                                st.markdown("- **Green Area**: Profit zone")
+                                st.markdown("- **Red Area**: Loss zone")
+                                st.markdown("- **Dotted Lines**: Max profit/loss levels")
+            else:
+                st.error("Both legs must be the same type (both Calls or both Puts) for a credit spread")
 
 # Sidebar inputs
 with st.sidebar:
@@ -128,6 +572,7 @@ with st.sidebar:
         min_value=datetime(2020, 1, 1).date(),
         help="Select historical date for option chain (must be a past date when markets were open)"
     )
+    as_of_str = as_of_date.isoformat()  # YYYY-MM-DD, used for every API call
     
     # Date validation helper
     if as_of_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
@@ -139,44 +584,41 @@ with st.sidebar:
     
     # Fetch stock price and expirations
     api = get_api_client()
+    if 'has_s3' not in st.session_state:
+        st.session_state.has_s3 = bool(api.s3_client)
     
     if ticker:
-        # Get stock price
-        with st.spinner("Fetching stock price..."):
-            stock_price = api.get_stock_price(ticker, as_of_date.strftime('%Y-%m-%d'))
-            if not stock_price:
-                stock_price = api.get_previous_close(ticker)
+        # Get stock price and available expirations
+        with st.spinner("Fetching stock price and expirations..."):
+            stock_price, expirations = fetch_uncached_if_empty(fetch_price_and_expirations, api, ticker, as_of_str)
             st.session_state.current_stock_price = stock_price
-            
-            if stock_price:
-                st.metric("Stock Price", f"${stock_price:,.2f}")
-        
-        # Get available expirations
-        with st.spinner("Loading expirations..."):
-            expirations = api.get_available_expirations(ticker, as_of_date.strftime('%Y-%m-%d'))
             st.session_state.expirations = expirations
+        
+        if stock_price:
+            st.metric("Stock Price", f"${stock_price:,.2f}")
     
     # Expiration dropdown
     if st.session_state.expirations:
+        # Days to expiration for each expiration, computed once per rerun
+        dte_by_exp = {exp: date_difference_days(exp, as_of_date) for exp in st.session_state.expirations}
+        
         # Filter out same-day expirations
-        valid_expirations = [exp for exp in st.session_state.expirations 
-                            if date_difference_days(exp, as_of_date) > 0]
+        valid_expirations = [exp for exp in st.session_state.expirations if dte_by_exp[exp] > 0]
         
         if valid_expirations:
             # Try to default to an expiration around 7-30 days out
-            days_out_list = [(exp, date_difference_days(exp, as_of_date)) for exp in valid_expirations]
-            ideal_exp = min(days_out_list, key=lambda x: abs(x[1] - 7))  # Target ~7 days
-            default_index = valid_expirations.index(ideal_exp[0])
+            days_out = np.array([dte_by_exp[exp] for exp in valid_expirations])
+            default_index = int(np.argmin(np.abs(days_out - 7)))  # Target ~7 days
             
             selected_expiration = st.selectbox(
                 "Expiration Date",
                 options=valid_expirations,
                 index=default_index,
-                format_func=lambda x: f"{x} ({date_difference_days(x, as_of_date)} days)"
+                format_func=lambda x: f"{x} ({dte_by_exp[x]} days)"
             )
             
             # Warn about short expirations
-            days_to_exp = date_difference_days(selected_expiration, as_of_date)
+            days_to_exp = dte_by_exp[selected_expiration]
             if days_to_exp <= 2:
                 st.warning(f"Very short expiration ({days_to_exp} days) may have limited strikes available. Try 5-30 days for better coverage.")
             elif days_to_exp >= 90:
@@ -195,7 +637,7 @@ with st.sidebar:
     # Check if parameters changed
     current_params = {
         'ticker': ticker,
-        'as_of_date': as_of_date.strftime('%Y-%m-%d') if as_of_date else None,
+        'as_of_date': as_of_str,
         'expiration': selected_expiration
     }
     params_changed = current_params != st.session_state.last_params
@@ -215,7 +657,7 @@ with st.sidebar:
     
     # Data source info
     st.subheader("Data Source")
-    if api.s3_client:
+    if st.session_state.has_s3:
         st.info("Using S3 Flat Files + REST API")
         with st.expander("Data Sources Info"):
             st.markdown("""
@@ -237,13 +679,16 @@ with st.sidebar:
     # Refresh button
     if st.button("Refresh Data", type="primary", use_container_width=True):
         st.session_state.option_chain = None
+        for cached_func in (fetch_price_and_expirations, fetch_option_chain, chain_strikes,
+                            prepare_option_chain, build_chain_table, summarize_option_chain):
+            cached_func.clear()
 
 # Main content area
 if ticker and selected_expiration:
     # Fetch option chain data
     if st.session_state.option_chain is None:
         with st.spinner(f"Loading option chain for {ticker} - {selected_expiration}..."):
-            option_chain = api.get_option_chain(ticker, selected_expiration, as_of_date.strftime('%Y-%m-%d'))
+            option_chain = fetch_uncached_if_empty(fetch_option_chain, api, ticker, selected_expiration, as_of_str)
             st.session_state.option_chain = option_chain
     else:
         option_chain = st.session_state.option_chain
@@ -259,17 +704,26 @@ if ticker and selected_expiration:
                     st.error(f"Missing required column: {col}")
                     st.stop()
         
-        # Split into calls and puts
-        calls = option_chain[option_chain['type'] == 'call'].copy()
-        puts = option_chain[option_chain['type'] == 'put'].copy()
+        # Volume and open interest are counts - keep them as Arrow-backed
+        # integers so sums and nlargest run on Arrow compute kernels. Missing
+        # counts become 0 so they don't surface as <NA> in the most active lists
+        for col in ['volume', 'open_interest']:
+            option_chain[col] = (pd.to_numeric(option_chain[col], errors='coerce')
+                                 .fillna(0).round().astype('int64[pyarrow]'))
+        
+        # Per-chain work is cached; reruns only re-slice the strike window
+        chain_key = (ticker, as_of_str, selected_expiration)
+        prepared = prepare_option_chain(chain_key, option_chain)
+        calls_by_strike = prepared['calls_by_strike']
+        puts_by_strike = prepared['puts_by_strike']
         
         # Get unique strikes and find ATM
-        strikes = sorted(option_chain['strike'].unique())
+        strikes = prepared['strikes']
         stock_price = st.session_state.current_stock_price
         
         # Find closest strike to current price
-        atm_strike = min(strikes, key=lambda x: abs(x - stock_price))
-        atm_index = strikes.index(atm_strike)
+        atm_index = nearest_strike_index(strikes, stock_price)
+        atm_strike = float(strikes[atm_index])
         
         # Check if we have a reasonable ATM
         atm_distance_pct = abs(atm_strike - stock_price) / stock_price * 100
@@ -286,12 +740,8 @@ if ticker and selected_expiration:
             display_strikes = strikes[start_idx:end_idx]
         
         
-        # Filter dataframes
-        calls_display = calls[calls['strike'].isin(display_strikes)].set_index('strike')
-        puts_display = puts[puts['strike'].isin(display_strikes)].set_index('strike')
-        
-        # Calculate days to expiration
-        dte = date_difference_days(selected_expiration, as_of_date)
+        # Days to expiration
+        dte = dte_by_exp[selected_expiration]
         
         # Display header metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -328,92 +778,36 @@ if ticker and selected_expiration:
         st.markdown("---")
         st.markdown("### Option Chain")
         
-        # Create data for display
-        option_chain_data = []
-        
-        # Sort strikes in descending order for display (highest first)
-        for strike in sorted(display_strikes, reverse=True):
-            call_data = calls_display.loc[strike] if strike in calls_display.index else pd.Series()
-            put_data = puts_display.loc[strike] if strike in puts_display.index else pd.Series()
-            
-            # Calculate moneyness
-            moneyness = ((stock_price - strike) / stock_price) * 100
-            
-            # Build row data based on display settings
-            row = {
-                'OI (C)': format_number(call_data.get('open_interest', 0)),
-                'Volume (C)': format_number(call_data.get('volume', 0)),
-                'Bid (C)': format_price(call_data.get('bid')) if 'bid' in call_data else '-',
-                'Ask (C)': format_price(call_data.get('ask')) if 'ask' in call_data else '-',
-                'Last (C)': format_price(call_data.get('last')),
-            }
-            
-            # Add Greeks if enabled and available
-            if show_greeks:
-                row['Δ (C)'] = format_greek(call_data.get('delta'))
-                row['IV (C)'] = format_greek(call_data.get('implied_volatility'))
-            
-            # Add strike info
-            row['Strike'] = f"${strike:,.0f}"
-            row['%'] = f"{moneyness:+.1f}%"
-            
-            # Add put data
-            row['Last (P)'] = format_price(put_data.get('last'))
-            row['Ask (P)'] = format_price(put_data.get('ask')) if 'ask' in put_data else '-'
-            row['Bid (P)'] = format_price(put_data.get('bid')) if 'bid' in put_data else '-'
-            
-            # Add put Greeks if enabled
-            if show_greeks:
-                row['IV (P)'] = format_greek(put_data.get('implied_volatility'))
-                row['Δ (P)'] = format_greek(put_data.get('delta'))
-            
-            row['Volume (P)'] = format_number(put_data.get('volume', 0))
-            row['OI (P)'] = format_number(put_data.get('open_interest', 0))
-            
-            # Add metadata for highlighting
-            row['_strike_val'] = strike
-            row['_is_atm'] = abs(strike - atm_strike) < 0.01
-            row['_is_call_itm'] = strike < stock_price
-            row['_is_put_itm'] = strike > stock_price
-            
-            option_chain_data.append(row)
-        
-        # Create DataFrame
-        df = pd.DataFrame(option_chain_data)
+        # Build the display table (reused until the chain or display settings change)
+        df = build_chain_table(chain_key, calls_by_strike, puts_by_strike, tuple(display_strikes),
+                               stock_price, atm_strike, show_greeks)
         
         if not df.empty:
             # Apply styling and display
             if highlight_itm:
+                # Create a copy without metadata for display
+                display_df = df.drop(columns=['_strike_val', '_is_atm', '_is_call_itm', '_is_put_itm'])
+                call_cols = [col for col in display_df.columns if '(C)' in col]
+                put_cols = [col for col in display_df.columns if '(P)' in col]
+                
                 # Style the dataframe
-                def style_option_chain(row):
-                    """Apply styling to option chain rows"""
-                    styles = [''] * len(row)
-                    
-                    # Find column indices
-                    strike_idx = row.index.get_loc('Strike')
+                def style_option_chain(frame):
+                    """Build the style grid for the whole option chain in one pass"""
+                    styles = pd.DataFrame('', index=frame.index, columns=frame.columns)
+                    is_atm = df['_is_atm']
+                    is_call_itm = df['_is_call_itm'] & ~is_atm
+                    is_put_itm = df['_is_put_itm'] & ~is_atm & ~is_call_itm
                     
-                    # Get metadata from original df using the row name (index)
-                    original_row = df.loc[row.name]
-                    
-                    if original_row.get('_is_atm', False):
-                        # ATM row - highlight strike column
-                        styles[strike_idx] = 'background-color: #e3f2fd; font-weight: bold'
-                    elif original_row.get('_is_call_itm', False):
-                        # ITM calls - light green background for call columns
-                        for i, col in enumerate(row.index):
-                            if '(C)' in col and not col.startswith('_'):
-                                styles[i] = 'background-color: #e8f5e9'
-                    elif original_row.get('_is_put_itm', False):
-                        # ITM puts - light red background for put columns
-                        for i, col in enumerate(row.index):
-                            if '(P)' in col and not col.startswith('_'):
-                                styles[i] = 'background-color: #ffebee'
+                    # ATM row - highlight strike column
+                    styles.loc[is_atm, 'Strike'] = 'background-color: #e3f2fd; font-weight: bold'
+                    # ITM calls - light green background for call columns
+                    styles.loc[is_call_itm, call_cols] = 'background-color: #e8f5e9'
+                    # ITM puts - light red background for put columns
+                    styles.loc[is_put_itm, put_cols] = 'background-color: #ffebee'
                     
                     return styles
                 
-                # Create a copy without metadata for display
-                display_df = df.drop(columns=['_strike_val', '_is_atm', '_is_call_itm', '_is_put_itm'])
-                styled_df = display_df.style.apply(style_option_chain, axis=1)
+                styled_df = display_df.style.apply(style_option_chain, axis=None)
                 st.dataframe(styled_df, use_container_width=True, hide_index=True)
             else:
                 # Remove metadata columns for non-styled display
@@ -444,307 +838,18 @@ if ticker and selected_expiration:
         
         # Credit Spread Calculator - expanded by default
         st.markdown("---")
-        with st.expander("Credit Spread Calculator", expanded=True):
-            st.markdown("### Option Spread Analysis")
-            
-            # Get available strikes and premiums from option chain if available
-            if 'option_chain' in st.session_state and st.session_state.option_chain is not None and not st.session_state.option_chain.empty:
-                option_data = st.session_state.option_chain
-                available_strikes = sorted(option_data['strike'].unique())
-                
-                # Find default strikes for spread
-                current_price = st.session_state.current_stock_price or 100
-                atm_strike = min(available_strikes, key=lambda x: abs(x - current_price))
-                atm_idx = available_strikes.index(atm_strike)
-                
-                # Default to 5 strikes OTM for each leg
-                sell_idx = min(atm_idx + 5, len(available_strikes) - 1)
-                buy_idx = min(atm_idx + 10, len(available_strikes) - 1)
-                
-                default_sell_strike = available_strikes[sell_idx]
-                default_buy_strike = available_strikes[buy_idx]
-                
-                # Get last prices for defaults
-                sell_call_data = option_data[(option_data['strike'] == default_sell_strike) & (option_data['type'] == 'call')]
-                buy_call_data = option_data[(option_data['strike'] == default_buy_strike) & (option_data['type'] == 'call')]
-                
-                default_sell_premium = sell_call_data['last'].iloc[0] if not sell_call_data.empty else 2.0
-                default_buy_premium = buy_call_data['last'].iloc[0] if not buy_call_data.empty else 0.5
-            else:
-                # Fallback values if no option chain loaded
-                available_strikes = []
-                default_sell_strike = 100.0
-                default_buy_strike = 105.0
-                default_sell_premium = 2.0
-                default_buy_premium = 0.5
-            
-            calc_col1, calc_col2, calc_col3 = st.columns([2, 2, 1])
-            
-            with calc_col1:
-                st.markdown("**Sell Leg (Short)**")
-                sell_type = st.radio("Type", ["Call", "Put"], key="sell_type", horizontal=True)
-                
-                if available_strikes:
-                    sell_strike = st.selectbox("Strike Price", options=available_strikes, 
-                                             index=available_strikes.index(default_sell_strike), 
-                                             key="sell_strike")
-                    # Get premium for selected strike
-                    sell_opt_data = option_data[(option_data['strike'] == sell_strike) & 
-                                               (option_data['type'] == sell_type.lower())]
-                    if not sell_opt_data.empty and sell_opt_data['last'].iloc[0] > 0:
-                        sell_premium = st.number_input("Premium Received", 
-                                                     value=float(sell_opt_data['last'].iloc[0]), 
-                                                     step=0.05, key="sell_premium")
-                    else:
-                        sell_premium = st.number_input("Premium Received", value=default_sell_premium, 
-                                                     step=0.05, key="sell_premium")
-                else:
-                    sell_strike = st.number_input("Strike Price", min_value=0.0, value=default_sell_strike, 
-                                                step=0.5, key="sell_strike")
-                    sell_premium = st.number_input("Premium Received", min_value=0.0, value=default_sell_premium, 
-                                                 step=0.05, key="sell_premium")
-            
-            with calc_col2:
-                st.markdown("**Buy Leg (Long)**")
-                buy_type = st.radio("Type", ["Call", "Put"], key="buy_type", horizontal=True)
-                
-                if available_strikes:
-                    buy_strike = st.selectbox("Strike Price", options=available_strikes, 
-                                            index=available_strikes.index(default_buy_strike), 
-                                            key="buy_strike")
-                    # Get premium for selected strike
-                    buy_opt_data = option_data[(option_data['strike'] == buy_strike) & 
-                                              (option_data['type'] == buy_type.lower())]
-                    if not buy_opt_data.empty and buy_opt_data['last'].iloc[0] > 0:
-                        buy_premium = st.number_input("Premium Paid", 
-                                                    value=float(buy_opt_data['last'].iloc[0]), 
-                                                    step=0.05, key="buy_premium")
-                    else:
-                        buy_premium = st.number_input("Premium Paid", value=default_buy_premium, 
-                                                    step=0.05, key="buy_premium")
-                else:
-                    buy_strike = st.number_input("Strike Price", min_value=0.0, value=default_buy_strike, 
-                                               step=0.5, key="buy_strike")
-                    buy_premium = st.number_input("Premium Paid", min_value=0.0, value=default_buy_premium, 
-                                                step=0.05, key="buy_premium")
-            
-            with calc_col3:
-                st.markdown("**Analysis**")
-                contracts = st.number_input("# Contracts", min_value=1, value=1, step=1)
-            
-            if st.button("Calculate Spread", type="primary"):
-                # Validate spread type
-                if sell_type == buy_type:
-                    # Credit spread calculation
-                    net_credit = sell_premium - buy_premium
-                    max_profit = net_credit * 100 * contracts
-                    
-                    if sell_type == "Call":
-                        # Call Credit Spread (Bear Call Spread)
-                        if sell_strike < buy_strike:
-                            spread_width = buy_strike - sell_strike
-                            max_loss = (spread_width - net_credit) * 100 * contracts
-                            breakeven = sell_strike + net_credit
-                            spread_name = "Bear Call Spread"
-                            valid_spread = True
-                        else:
-                            st.error("For a Call Credit Spread, sell strike must be lower than buy strike")
-                            valid_spread = False
-                    else:
-                        # Put Credit Spread (Bull Put Spread)  
-                        if sell_strike > buy_strike:
-                            spread_width = sell_strike - buy_strike
-                            max_loss = (spread_width - net_credit) * 100 * contracts
-                            breakeven = sell_strike - net_credit
-                            spread_name = "Bull Put Spread"
-                            valid_spread = True
-                        else:
-                            st.error("For a Put Credit Spread, sell strike must be higher than buy strike")
-                            valid_spread = False
-                    
-                    # Display results
-                    if valid_spread:
-                        result_col1, result_col2 = st.columns(2)
-                        
-                        with result_col1:
-                            st.success(f"**{spread_name}**")
-                            st.metric("Net Credit", f"${net_credit:.2f}")
-                            st.metric("Max Profit", f"${max_profit:.2f}")
-                            st.metric("Max Loss", f"-${abs(max_loss):.2f}")
-                            st.metric("Breakeven", f"${breakeven:.2f}")
-                            
-                            if max_loss != 0:
-                                risk_reward = abs(max_profit / max_loss)
-                                st.metric("Risk/Reward Ratio", f"1:{risk_reward:.2f}")
-                        
-                        with result_col2:
-                            # Create P&L diagram
-                            if st.session_state.current_stock_price:
-                                current_price = st.session_state.current_stock_price
-                                price_range = np.linspace(
-                                    min(sell_strike, buy_strike) * 0.9,
-                                    max(sell_strike, buy_strike) * 1.1,
-                                    100
-                                )
-                                
-                                pnl = []
-                                for price in price_range:
-                                    if sell_type == "Call":
-                                        # Bear Call Spread P&L
-                                        sell_intrinsic = max(0, price - sell_strike)
-                                        buy_intrinsic = max(0, price - buy_strike)
-                                        position_pnl = (net_credit - sell_intrinsic + buy_intrinsic) * 100 * contracts
-                                    else:  # Put
-                                        # Bull Put Spread P&L
-                                        sell_intrinsic = max(0, sell_strike - price)
-                                        buy_intrinsic = max(0, buy_strike - price)
-                                        position_pnl = (net_credit - sell_intrinsic + buy_intrinsic) * 100 * contracts
-                                    
-                                    pnl.append(position_pnl)
-                                
-                                # Create plot
-                                fig = go.Figure()
-                                
-                                # Add P&L line
-                                fig.add_trace(go.Scatter(
-                                    x=price_range,
-                                    y=pnl,
-                                    mode='lines',
-                                    name='P&L',
-                                    line=dict(color='blue', width=3)
-                                ))
-                                
-                                # Add shaded regions first (so they appear behind everything)
-                                fig.add_hrect(y0=0, y1=max_profit, fillcolor="green", opacity=0.1)
-                                fig.add_hrect(y0=-abs(max_loss), y1=0, fillcolor="red", opacity=0.1)
-                                
-                                # Add horizontal lines without annotations (we'll add text separately)
-                                fig.add_hline(y=0, line_dash="dash", line_color="gray", line_width=1)
-                                fig.add_hline(y=max_profit, line_dash="dot", line_color="green", line_width=2)
-                                fig.add_hline(y=-abs(max_loss), line_dash="dot", line_color="red", line_width=2)
-                                
-                                # Add vertical lines for breakeven and current price
-                                fig.add_vline(x=breakeven, line_dash="dash", line_color="orange", line_width=2)
-                                if current_price:
-                                    fig.add_vline(x=current_price, line_dash="dash", line_color="green", line_width=2)
-                                
-                                # Add text annotations as separate traces positioned inside the plot area
-                                # Position annotations at 95% of the x-axis range to keep them inside
-                                x_pos_right = price_range[-1] - (price_range[-1] - price_range[0]) * 0.05
-                                x_pos_left = price_range[0] + (price_range[-1] - price_range[0]) * 0.05
-                                
-                                # Max Profit annotation
-                                fig.add_annotation(
-                                    x=x_pos_right,
-                                    y=max_profit,
-                                    text=f"Max Profit: ${max_profit:.2f}",
-                                    showarrow=False,
-                                    bgcolor="rgba(255, 255, 255, 0.8)",
-                                    bordercolor="green",
-                                    borderwidth=1,
-                                    font=dict(color="green", size=12),
-                                    xanchor="right",
-                                    yanchor="middle"
-                                )
-                                
-                                # Max Loss annotation
-                                fig.add_annotation(
-                                    x=x_pos_right,
-                                    y=-abs(max_loss),
-                                    text=f"Max Loss: ${abs(max_loss):.2f}",
-                                    showarrow=False,
-                                    bgcolor="rgba(255, 255, 255, 0.8)",
-                                    bordercolor="red",
-                                    borderwidth=1,
-                                    font=dict(color="red", size=12),
-                                    xanchor="right",
-                                    yanchor="middle"
-                                )
-                                
-                                # Breakeven annotation
-                                fig.add_annotation(
-                                    x=breakeven,
-                                    y=max_profit * 0.8,  # Position it 80% up the chart
-                                    text=f"BE: ${breakeven:.2f}",
-                                    showarrow=True,
-                                    arrowhead=2,
-                                    arrowsize=1,
-                                    arrowwidth=2,
-                                    arrowcolor="orange",
-                                    ax=0,
-                                    ay=-30,
-                                    bgcolor="rgba(255, 255, 255, 0.8)",
-                                    bordercolor="orange",
-                                    borderwidth=1,
-                                    font=dict(color="orange", size=12)
-                                )
-                                
-                                # Current price annotation
-                                if current_price:
-                                    fig.add_annotation(
-                                        x=current_price,
-                                        y=max_profit * 0.6,  # Position it 60% up the chart
-                                        text=f"Current: ${current_price:.2f}",
-                                        showarrow=True,
-                                        arrowhead=2,
-                                        arrowsize=1,
-                                        arrowwidth=2,
-                                        arrowcolor="green",
-                                        ax=0,
-                                        ay=-30,
-                                        bgcolor="rgba(255, 255, 255, 0.8)",
-                                        bordercolor="green",
-                                        borderwidth=1,
-                                        font=dict(color="green", size=12)
-                                    )
-                                
-                                # Update layout with proper margins and y-axis range
-                                y_range_buffer = abs(max_loss) * 0.1  # 10% buffer
-                                
-                                fig.update_layout(
-                                    title=f"{spread_name} P&L Diagram",
-                                    xaxis_title="Stock Price",
-                                    yaxis_title="Profit/Loss ($)",
-                                    height=450,  # Slightly taller for better visibility
-                                    showlegend=True,
-                                    hovermode='x unified',
-                                    margin=dict(l=80, r=80, t=80, b=60),  # Balanced margins
-                                    yaxis=dict(
-                                        range=[-abs(max_loss) - y_range_buffer, max_profit + y_range_buffer]
-                                    ),
-                                    xaxis=dict(
-                                        range=[price_range[0], price_range[-1]]
-                                    )
-                                )
-                                
-                                st.plotly_chart(fig, use_container_width=True)
-                                
-                                # Add legend explanation
-                                st.markdown("**Chart Legend:**")
-                                legend_col1, legend_col2 = st.columns(2)
-                                with legend_col1:
-                                    st.markdown("- **Blue Line**: P&L at expiration")
-                                    st.markdown("- **Orange Dashed**: Breakeven price")
-                                    st.markdown("- **Green Dashed**: Current stock price")
-                                with legend_col2:
-                                    st.markdown("- **Green Area**: Profit zone")
-                                    st.markdown("- **Red Area**: Loss zone")
-                                    st.markdown("- **Dotted Lines**: Max profit/loss levels")
-                else:
-                    st.error("Both legs must be the same type (both Calls or both Puts) for a credit spread")
+        credit_spread_calculator(prepared)
         
         # Summary statistics - moved outside of credit spread calculator
         st.markdown("---")
         col1, col2, col3, col4 = st.columns(4)
         
         # Calculate totals from full option chain (not just displayed)
-        if not option_chain.empty:
-            total_call_volume = option_chain[option_chain['type'] == 'call']['volume'].sum()
-            total_call_oi = option_chain[option_chain['type'] == 'call']['open_interest'].sum()
-            total_put_volume = option_chain[option_chain['type'] == 'put']['volume'].sum()
-            total_put_oi = option_chain[option_chain['type'] == 'put']['open_interest'].sum()
-        else:
-            total_call_volume = total_call_oi = total_put_volume = total_put_oi = 0
+        totals = prepared['totals']
+        total_call_volume = totals['call_volume']
+        total_call_oi = totals['call_oi']
+        total_put_volume = totals['put_volume']
+        total_put_oi = totals['put_oi']
         
         with col1:
             st.markdown("##### Call Statistics")
@@ -797,40 +902,26 @@ if ticker and selected_expiration:
                 st.metric("Options Flow", "N/A")
         
         # Most Active Options
-        if not option_chain.empty and option_chain['volume'].sum() > 0:
+        if total_call_volume + total_put_volume > 0:
             st.markdown("---")
             st.markdown("### Most Active Options")
             
-            active_calls = option_chain[option_chain['type'] == 'call'].nlargest(5, 'volume')
-            active_puts = option_chain[option_chain['type'] == 'put'].nlargest(5, 'volume')
+            active_calls = prepared['active_calls']
+            active_puts = prepared['active_puts']
             
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("#### Top Active Calls")
                 if not active_calls.empty:
-                    for _, opt in active_calls.iterrows():
-                        if 'bid' in opt and 'ask' in opt and pd.notna(opt['bid']) and pd.notna(opt['ask']):
-                            bid_ask = f"Bid: ${opt['bid']:.2f}, Ask: ${opt['ask']:.2f}"
-                        else:
-                            bid_ask = f"Last: ${opt.get('last', 'N/A')}"
-                        greeks = ""
-                        if show_greeks and 'delta' in opt and pd.notna(opt['delta']):
-                            greeks = f" | Δ={opt['delta']:.3f}, IV={opt.get('implied_volatility', 0):.3f}"
-                        st.text(f"${opt['strike']:.0f} Strike: Vol={opt['volume']:,}, {bid_ask}{greeks}")
+                    for line in format_active_options(active_calls, show_greeks):
+                        st.text(line)
             
             with col2:
                 st.markdown("#### Top Active Puts")
                 if not active_puts.empty:
-                    for _, opt in active_puts.iterrows():
-                        if 'bid' in opt and 'ask' in opt and pd.notna(opt['bid']) and pd.notna(opt['ask']):
-                            bid_ask = f"Bid: ${opt['bid']:.2f}, Ask: ${opt['ask']:.2f}"
-                        else:
-                            bid_ask = f"Last: ${opt.get('last', 'N/A')}"
-                        greeks = ""
-                        if show_greeks and 'delta' in opt and pd.notna(opt['delta']):
-                            greeks = f" | Δ={opt['delta']:.3f}, IV={opt.get('implied_volatility', 0):.3f}"
-                        st.text(f"${opt['strike']:.0f} Strike: Vol={opt['volume']:,}, {bid_ask}{greeks}")
+                    for line in format_active_options(active_puts, show_greeks):
+                        st.text(line)
         
     else:
         # Provide helpful message about why no data is available
@@ -838,7 +929,7 @@ if ticker and selected_expiration:
         
         # Check common issues
         if selected_expiration and as_of_date:
-            dte = date_difference_days(selected_expiration, as_of_date)
+            dte = dte_by_exp[selected_expiration]
             if dte == 0:
                 st.error("Options expiring on the same day (0 DTE) typically have no historical data.")
                 st.info("**Solution**: Select an expiration date that's at least 1 day after your 'as of' date.")
@@ -875,12 +966,16 @@ st.caption("Data provided by Polygon.io | Enhanced with S3 Flat Files | Built by
 # Debug info (hidden by default)
 with st.expander("Debug Information", expanded=False):
     if 'option_chain' in st.session_state and st.session_state.option_chain is not None:
-        st.write("**Option Chain Shape:**", st.session_state.option_chain.shape)
-        st.write("**Columns:**", list(st.session_state.option_chain.columns))
+        debug_chain = st.session_state.option_chain
+        # Empty chains aren't cached by fetch_option_chain, so keep them out of
+        # the per-chain caches too or a later successful fetch would read them
+        summary = {} if debug_chain.empty else summarize_option_chain((ticker, as_of_str, selected_expiration), debug_chain)
+        st.write("**Option Chain Shape:**", debug_chain.shape)
+        st.write("**Columns:**", list(debug_chain.columns))
         
         # Show strike distribution
-        if 'strike' in st.session_state.option_chain.columns:
-            strikes_in_data = sorted(st.session_state.option_chain['strike'].unique())
+        if 'strikes' in summary:
+            strikes_in_data = summary['strikes']
             st.write(f"\n**All Strikes in Data: {len(strikes_in_data)} total**")
             if len(strikes_in_data) > 20:
                 st.write(f"First 10: {strikes_in_data[:10]}")
@@ -889,32 +984,29 @@ with st.expander("Debug Information", expanded=False):
                 st.write(f"Strikes: {strikes_in_data}")
         
         # Check data quality by source
-        if 'data_source' in st.session_state.option_chain.columns:
+        if 'source_counts' in summary:
             st.write("\n**Data Sources:**")
-            source_counts = st.session_state.option_chain['data_source'].value_counts()
-            for source, count in source_counts.items():
-                st.write(f"  - {source}: {count} options")
+            st.dataframe(summary['source_counts'])
         
         # Check Greeks availability
-        if 'delta' in st.session_state.option_chain.columns:
-            greeks_available = st.session_state.option_chain.dropna(subset=['delta'])
-            st.write(f"\n**Greeks Available:** {len(greeks_available)}/{len(st.session_state.option_chain)} options ({len(greeks_available)/len(st.session_state.option_chain)*100:.1f}%)")
+        total_options = len(debug_chain)
+        if 'greeks_n' in summary:
+            greeks_available = summary['greeks_n']
+            st.write(f"\n**Greeks Available:** {greeks_available}/{total_options} options ({greeks_available/total_options*100:.1f}%)")
         
         # Check bid/ask data
-        total_options = len(st.session_state.option_chain)
         if total_options > 0:
-            if 'bid' in st.session_state.option_chain.columns and 'ask' in st.session_state.option_chain.columns:
-                options_with_quotes = len(st.session_state.option_chain.dropna(subset=['bid', 'ask']))
+            if 'quotes_n' in summary:
+                options_with_quotes = summary['quotes_n']
                 st.write(f"\n**Bid/Ask Coverage:** {options_with_quotes}/{total_options} options ({options_with_quotes/total_options*100:.1f}%)")
                 
                 # Show if bid/ask is estimated
-                if options_with_quotes > 0 and 'data_source' in st.session_state.option_chain.columns:
-                    if 's3_flatfiles' in st.session_state.option_chain['data_source'].values:
-                        st.info("Bid/Ask prices are estimated based on last trade and volume")
+                if options_with_quotes > 0 and summary.get('has_s3_source'):
+                    st.info("Bid/Ask prices are estimated based on last trade and volume")
             else:
                 st.write("\n**Bid/Ask Coverage:** No bid/ask data available")
         else:
             st.write("\n**Data Status:** No options data found")
         
         st.write("\n**Sample Data:**")
-        st.dataframe(st.session_state.option_chain.head())
\ No newline at end of file
+        st.dataframe(debug_chain.head())
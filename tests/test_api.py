@@ -6,10 +6,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.polygon_api import PolygonOptionsAPI
+from utils.polygon_api import PolygonOptionsAPI, count_complete
 from dotenv import load_dotenv
 import pandas as pd
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
@@ -39,14 +40,22 @@ def test_api_access():
     
     print(f"\nTesting with {test_ticker} on {test_date}")
     
+    # The price, previous close and expiration lookups are independent -
+    # start them together and report the results in order below
+    executor = ThreadPoolExecutor(max_workers=3)
+    price_future = executor.submit(api.get_stock_price, test_ticker, test_date)
+    prev_close_future = executor.submit(api.get_previous_close, test_ticker)
+    expirations_future = executor.submit(api.get_available_expirations, test_ticker, test_date)
+    executor.shutdown(wait=False)
+    
     # Test 1: Get stock price
     print("\nTest 1: Stock Price")
-    price = api.get_stock_price(test_ticker, test_date)
+    price = price_future.result()
     if price:
         print(f"  Current price: ${price:.2f}")
     else:
         print("  Could not fetch stock price, trying previous close...")
-        price = api.get_previous_close(test_ticker)
+        price = prev_close_future.result()
         if price:
             print(f"  Previous close: ${price:.2f}")
         else:
@@ -56,14 +65,14 @@ def test_api_access():
     if api.s3_client:
         print("\nTest 2: S3 Flat Files Access")
         try:
-            # Try to fetch aggregates data
-            aggs_df = api.get_s3_options_data(test_date, 'day_aggs_v1')
-            if not aggs_df.empty:
-                print(f"  Successfully fetched {len(aggs_df)} aggregate records")
-                
-                # Check for NVDA options
-                nvda_options = aggs_df[aggs_df['ticker'].str.startswith('O:NVDA')]
-                print(f"  Found {len(nvda_options)} NVDA option contracts")
+            # Try to fetch aggregates data - only the NVDA rows and printed columns
+            nvda_options = api.get_s3_options_data(
+                test_date, 'day_aggs_v1',
+                columns=['ticker', 'volume', 'open', 'high', 'low', 'close'],
+                ticker_prefix=f'O:{test_ticker}'
+            )
+            if not nvda_options.empty:
+                print(f"  Successfully fetched aggregate records for {len(nvda_options)} NVDA option contracts")
                 
                 # Sample data
                 if len(nvda_options) > 0:
@@ -81,7 +90,7 @@ def test_api_access():
     
     # Test 3: Get available expirations
     print("\nTest 3: Available Expirations")
-    expirations = api.get_available_expirations(test_ticker, test_date)
+    expirations = expirations_future.result()
     if expirations:
         print(f"  Found {len(expirations)} expiration dates")
         print(f"  Next 5 expirations: {expirations[:5]}")
@@ -90,9 +99,11 @@ def test_api_access():
         print("  Failed to fetch expirations")
         return False
     
-    # Test 4: Get option chain with S3 enhancement
+    # Test 4: Get option chains with S3 enhancement (nearest expirations in one batch)
     print(f"\nTest 4: Option Chain for {test_expiration}")
-    option_chain = api.get_option_chain(test_ticker, test_expiration, test_date)
+    chains = api.get_option_chains(test_ticker, expirations[:3], test_date)
+    print("  Options per expiration: " + ", ".join(f"{exp}: {len(chain)}" for exp, chain in chains.items()))
+    option_chain = chains[test_expiration]
     
     if not option_chain.empty:
         print(f"  Found {len(option_chain)} options")
@@ -111,8 +122,8 @@ def test_api_access():
         print(f"  Calls: {len(calls)}, Puts: {len(puts)}")
         
         # Check bid/ask availability
-        with_quotes = option_chain.dropna(subset=['bid', 'ask'])
-        print(f"  Options with bid/ask: {len(with_quotes)} ({len(with_quotes)/len(option_chain)*100:.1f}%)")
+        with_quotes = count_complete(option_chain, ['bid', 'ask'])
+        print(f"  Options with bid/ask: {with_quotes} ({with_quotes/len(option_chain)*100:.1f}%)")
         
         # Check volume data
         with_volume = option_chain[option_chain['volume'] > 0]
@@ -120,8 +131,8 @@ def test_api_access():
         
         # Check Greeks if available
         if 'delta' in option_chain.columns:
-            with_greeks = option_chain.dropna(subset=['delta'])
-            print(f"  Options with Greeks: {len(with_greeks)} ({len(with_greeks)/len(option_chain)*100:.1f}%)")
+            with_greeks = count_complete(option_chain, ['delta'])
+            print(f"  Options with Greeks: {with_greeks} ({with_greeks/len(option_chain)*100:.1f}%)")
         
         # Sample data with more details
         print("\n  Sample option data (sorted by volume):")
@@ -180,6 +191,15 @@ def test_s3_data_formats():
             print(f"    Error: {e}")
 
 if __name__ == "__main__":
+    try:
+        # Optional: reuse REST responses across runs for 15 minutes so repeated
+        # test runs don't re-hit Polygon (pip install requests-cache). Installed
+        # here so importing this module doesn't patch requests process-wide
+        import requests_cache
+        requests_cache.install_cache('.polygon_cache', backend='sqlite', expire_after=900)
+    except ImportError:
+        pass
+    
     print("Enhanced Polygon API Test Suite with S3 Support")
     print("="*60)
     
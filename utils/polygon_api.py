@@ -4,23 +4,145 @@ S3 flat files support and Black-Scholes calculations
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-import time
 import boto3
 from botocore.config import Config
-import gzip
-import io
-from scipy.stats import norm
+from scipy.special import ndtr
+import bisect
 import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import os
+from pathlib import Path
+
+try:
+    # ISA-L's drop-in gzip decompresses considerably faster than the stdlib one
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+
+try:
+    # Native (C++) S3 client - not every pyarrow build ships with S3 support
+    from pyarrow.fs import AwsStandardS3RetryStrategy, S3FileSystem
+except ImportError:
+    S3FileSystem = None
+
+# Number of parsed S3 day files kept in memory (each is the whole OPRA day)
+S3_CACHE_SIZE = 2
+
+# (connect, read) timeout for REST requests, so a stalled call can't hang the app
+HTTP_TIMEOUT = (5, 30)
+
+# Keep-alive connections the REST session pools per host; also the default
+# fan-out for batched lookups so no worker waits on a connection
+HTTP_POOL_SIZE = 16
+
+# Number of historical option chains and snapshots kept per client. Past
+# dates never change, so repeat requests are served without any I/O
+CHAIN_CACHE_SIZE = 64
+
+# Fixed types for flat file columns, so streamed blocks all share one schema
+S3_COLUMN_TYPES = {
+    'ticker': pa.string(),
+    'open': pa.float64(),
+    'high': pa.float64(),
+    'low': pa.float64(),
+    'close': pa.float64(),
+    'price': pa.float64(),
+}
+
+# Columns read when no explicit columns are requested, per data type (all of
+# them for types not listed). Day aggregates also carry window_start and
+# transactions, which nothing here uses
+S3_DEFAULT_COLUMNS = {
+    'day_aggs_v1': ['ticker', 'volume', 'open', 'close', 'high', 'low'],
+}
+
+# Day files are tens of MB uncompressed; larger blocks mean fewer, bigger
+# batches for the threaded parser (and for the prefix filter when streaming)
+S3_READ_OPTIONS = pacsv.ReadOptions(block_size=16 << 20)
+
+# Option symbols stay in Arrow memory rather than one Python str object per row
+S3_STRING_DTYPE = pd.StringDtype('pyarrow')
+
+# Flat files carry no quotes, so bid/ask are estimated from the last price with
+# a spread that narrows with daily volume: <=100, <=1000, >1000 contracts
+SPREAD_VOLUME_BINS = np.array([100, 1000])
+SPREAD_PCTS = np.array([0.10, 0.05, 0.02])
+
+def estimate_bid_ask(last: np.ndarray, volume: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Estimated (bid, ask) arrays, rounded to cents; both 0 where there is no last price"""
+    half_spread = last * SPREAD_PCTS[np.searchsorted(SPREAD_VOLUME_BINS, volume)] / 2
+    traded = last > 0
+    bid = np.where(traded, np.round(np.maximum(0.01, last - half_spread), 2), 0)
+    ask = np.where(traded, np.round(last + half_spread, 2), 0)
+    return bid, ask
+
+# Standard normal density at 0, 1/sqrt(2*pi)
+INV_SQRT_2PI = 0.3989422804014327
+
+def calculate_greeks_vectorized(S: float, K: np.ndarray, T: float, r: float,
+                                sigma: np.ndarray, is_call: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Black-Scholes Greeks for a whole set of contracts at once
+    
+    Same formulas and rounding as PolygonOptionsAPI.calculate_greeks, but one
+    ufunc pass per Greek over the strike/IV arrays rather than a scipy.stats
+    call per contract. T and sigma must be positive.
+    """
+    sqrt_T = math.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    pdf_d1 = np.exp(-0.5 * d1 * d1) * INV_SQRT_2PI
+    discounted_K = K * math.exp(-r * T)
+    
+    # Calls use N(d2), puts -N(-d2)
+    signed_cdf_d2 = np.where(is_call, ndtr(d2), -ndtr(-d2))
+    
+    return {
+        'delta': np.round(np.where(is_call, ndtr(d1), ndtr(d1) - 1), 4),
+        'gamma': np.round(pdf_d1 / (S * sigma * sqrt_T), 4),
+        'theta': np.round((-S * pdf_d1 * sigma / (2 * sqrt_T) - r * discounted_K * signed_cdf_d2) / 365, 4),
+        'vega': np.round(S * pdf_d1 * sqrt_T / 100, 4),
+        'rho': np.round(discounted_K * T * signed_cdf_d2 / 100, 4),
+    }
+
+def count_complete(df: pd.DataFrame, columns: List[str]) -> int:
+    """Count rows where every one of the given columns has a value"""
+    return int(df[columns].notna().to_numpy().all(axis=1).sum())
+
+def select_ticker_prefix(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
+    """
+    Rows of a ticker-sorted frame whose ticker starts with prefix
+    
+    Matching tickers form one contiguous block in sorted order, so it is
+    located with two binary searches instead of a string scan of every row.
+    """
+    # Everything with the prefix sorts between it and the prefix with its
+    # last character bumped ('O:SPY' -> 'O:SPZ'). Bisecting the column's own
+    # array avoids converting Arrow-backed strings to objects first
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    tickers = df['ticker'].array
+    start = bisect.bisect_left(tickers, prefix)
+    stop = bisect.bisect_left(tickers, upper, lo=start)
+    return df.iloc[start:stop]
 
 class PolygonOptionsAPI:
     """Simple wrapper for Polygon.io Options API with S3 flat files support"""
     
     def __init__(self, api_key: str, s3_access_key: Optional[str] = None, 
-                 s3_secret_key: Optional[str] = None):
+                 s3_secret_key: Optional[str] = None,
+                 s3_cache_dir: Optional[Path] = None):
         """
         Initialize the API client with API key and optional S3 credentials
         
@@ -28,14 +150,39 @@ class PolygonOptionsAPI:
             api_key: Polygon API key
             s3_access_key: S3 access key for flat files
             s3_secret_key: S3 secret key for flat files
+            s3_cache_dir: Directory to keep Parquet copies of day_aggs_v1 files in,
+                so a later session skips download and parse (disabled if None).
+                Files are never removed, so point it at a dedicated directory
         """
         self.api_key = api_key
         self.base_url = "https://api.polygon.io"
         self.session = requests.Session()
         self.session.headers.update({'Authorization': f'Bearer {api_key}'})
+        # Pooled keep-alive connections for every REST call, with backoff on
+        # rate limiting (honouring Retry-After) and transient server errors.
+        # The final response is still returned, so status checks stay as they are
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False)
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE, max_retries=retry))
         
         # Initialize S3 client if credentials provided
         self.s3_client = None
+        self.s3_fs = None
+        # Serializes day-file loads so concurrent chain requests share one download
+        self._s3_lock = threading.Lock()
+        
+        # Response caches. Created up front rather than on first use, since
+        # get_option_chains and get_stock_prices call in from several threads.
+        # One S3 file holds every contract for the day, so expirations and all
+        # chains for that date share a single download
+        self._s3_cache = {}
+        self._price_cache = {}
+        self._expiration_cache = {}
+        self._chain_cache = {}
+        self._snapshot_cache = {}
+        # Guards insertion and FIFO eviction of the bounded chain/snapshot caches
+        self._cache_lock = threading.Lock()
+        self.s3_cache_dir = Path(s3_cache_dir) if s3_cache_dir is not None else None
         if s3_access_key and s3_secret_key:
             session = boto3.Session(
                 aws_access_key_id=s3_access_key,
@@ -44,9 +191,23 @@ class PolygonOptionsAPI:
             self.s3_client = session.client(
                 's3',
                 endpoint_url='https://files.polygon.io',
-                config=Config(signature_version='s3v4'),
+                # Keep the connection warm between day files and back off and
+                # retry on throttling or dropped connections instead of failing
+                config=Config(signature_version='s3v4', tcp_keepalive=True,
+                              retries={'mode': 'adaptive', 'max_attempts': 5}),
             )
             self.bucket_name = 'flatfiles'
+            
+            # Arrow filesystem reads flat files without going through Python I/O
+            if S3FileSystem is not None:
+                self.s3_fs = S3FileSystem(
+                    access_key=s3_access_key,
+                    secret_key=s3_secret_key,
+                    endpoint_override='files.polygon.io',
+                    scheme='https',
+                    region='us-east-1',
+                    retry_strategy=AwsStandardS3RetryStrategy(max_attempts=5),
+                )
     
     def calculate_greeks(self, S: float, K: float, T: float, r: float, 
                         sigma: float, option_type: str) -> Dict[str, float]:
@@ -68,23 +229,29 @@ class PolygonOptionsAPI:
         if T <= 0 or sigma <= 0:
             return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0, 'rho': 0}
         
-        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
+        # Scalar inputs, so math avoids NumPy's per-call array dispatch
+        sqrt_T = math.sqrt(T)
+        discounted_K = K * math.exp(-r * T)
         
+        d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+        d2 = d1 - sigma * sqrt_T
+        pdf_d1 = INV_SQRT_2PI * math.exp(-0.5 * d1 * d1)
+        
+        # ndtr is the standard normal CDF without scipy.stats' per-call overhead
         if option_type.lower() == 'call':
-            delta = norm.cdf(d1)
-            theta = (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T)) - 
-                     r * K * np.exp(-r * T) * norm.cdf(d2)) / 365
-            rho = K * T * np.exp(-r * T) * norm.cdf(d2) / 100
+            delta = ndtr(d1)
+            theta = (-S * pdf_d1 * sigma / (2 * sqrt_T) - 
+                     r * discounted_K * ndtr(d2)) / 365
+            rho = discounted_K * T * ndtr(d2) / 100
         else:  # put
-            delta = norm.cdf(d1) - 1
-            theta = (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T)) + 
-                     r * K * np.exp(-r * T) * norm.cdf(-d2)) / 365
-            rho = -K * T * np.exp(-r * T) * norm.cdf(-d2) / 100
+            delta = ndtr(d1) - 1
+            theta = (-S * pdf_d1 * sigma / (2 * sqrt_T) + 
+                     r * discounted_K * ndtr(-d2)) / 365
+            rho = -discounted_K * T * ndtr(-d2) / 100
         
         # Greeks that are same for calls and puts
-        gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
-        vega = S * norm.pdf(d1) * np.sqrt(T) / 100
+        gamma = pdf_d1 / (S * sigma * sqrt_T)
+        vega = S * pdf_d1 * sqrt_T / 100
         
         return {
             'delta': round(delta, 4),
@@ -94,16 +261,24 @@ class PolygonOptionsAPI:
             'rho': round(rho, 4)
         }
     
-    def get_s3_options_data(self, date: str, data_type: str = 'day_aggs_v1') -> pd.DataFrame:
+    def get_s3_options_data(self, date: str, data_type: str = 'day_aggs_v1',
+                            columns: Optional[List[str]] = None,
+                            ticker_prefix: Optional[str] = None) -> pd.DataFrame:
         """
         Fetch options data from S3 flat files
         
         Args:
             date: Date in YYYY-MM-DD format
             data_type: Type of data ('day_aggs_v1', 'minute_aggs_v1', 'trades_v1')
+            columns: Only read these columns (S3_DEFAULT_COLUMNS for the data type if None)
+            ticker_prefix: Only keep rows whose ticker starts with this (e.g. 'O:SPY')
             
         Returns:
-            DataFrame with options data
+            DataFrame with options data. Full reads are shared with the in-memory
+            cache, so callers should filter/copy rather than modify them in place;
+            reads narrowed by columns or ticker_prefix are not cached. day_aggs_v1
+            reads are sorted by ticker; other data types keep the file's row order,
+            so time series stay in time order.
         """
         if not self.s3_client:
             print("S3 client not initialized")
@@ -117,23 +292,102 @@ class PolygonOptionsAPI:
         # Construct S3 key
         s3_key = f'us_options_opra/{data_type}/{year}/{month}/{date}.csv.gz'
         
-        try:
-            # Download file from S3
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
-            
-            # Read gzipped CSV
-            with gzip.GzipFile(fileobj=io.BytesIO(response['Body'].read())) as gz:
-                df = pd.read_csv(gz)
+        # The ticker column is needed to filter on, even if not requested
+        read_columns = columns
+        if columns is None:
+            read_columns = S3_DEFAULT_COLUMNS.get(data_type)
+        elif ticker_prefix is not None and 'ticker' not in columns:
+            read_columns = ['ticker'] + list(columns)
+        
+        with self._s3_lock:
+            cached = self._s3_cache.get(s3_key)
+            if cached is not None and (columns is None or set(columns) <= set(cached.columns)):
+                df = cached
+                if ticker_prefix is not None:
+                    if data_type == 'day_aggs_v1':
+                        df = select_ticker_prefix(df, ticker_prefix)
+                    else:
+                        df = df[df['ticker'].str.startswith(ticker_prefix)]
+                return df if columns is None else df[columns]
             
-            print(f"Loaded {len(df)} records from S3: {s3_key}")
-            return df
+            cache_path = None
+            # Only day aggregates go to disk - minute and trade files run to GBs a day
+            if self.s3_cache_dir is not None and data_type == 'day_aggs_v1':
+                cache_path = self.s3_cache_dir / f'{data_type}_{date}.parquet'
             
+            try:
+                if (cache_path is not None and cache_path.exists() and
+                        (read_columns is None or set(read_columns) <= set(pq.read_schema(cache_path).names))):
+                    # Saved already sorted by ticker; narrowed reads only load
+                    # the Parquet columns they need
+                    table = pq.read_table(cache_path, columns=read_columns)
+                    if ticker_prefix is not None:
+                        table = table.filter(pc.starts_with(table['ticker'], ticker_prefix))
+                    source_name = str(cache_path)
+                else:
+                    if self.s3_fs is not None:
+                        # Stream and decompress with Arrow
+                        source = self.s3_fs.open_input_stream(f'{self.bucket_name}/{s3_key}')
+                    else:
+                        # Download with boto3, decompressing straight off the response
+                        # stream rather than buffering the whole compressed file first
+                        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+                        source = gzip.GzipFile(fileobj=response['Body'])
+                    
+                    # Either way, parse with Arrow's multithreaded CSV reader
+                    convert_options = pacsv.ConvertOptions(column_types=S3_COLUMN_TYPES,
+                                                           include_columns=read_columns or [])
+                    with source as stream:
+                        if ticker_prefix is None:
+                            table = pacsv.read_csv(stream, read_options=S3_READ_OPTIONS,
+                                                   convert_options=convert_options)
+                        else:
+                            # Filter block by block so only matching rows are kept
+                            reader = pacsv.open_csv(stream, read_options=S3_READ_OPTIONS,
+                                                    convert_options=convert_options)
+                            batches = [batch.filter(pc.starts_with(batch.column('ticker'), ticker_prefix))
+                                       for batch in reader]
+                            table = pa.Table.from_batches(batches, schema=reader.schema)
+                    source_name = f"S3: {s3_key}"
+                df = table.to_pandas(types_mapper={pa.string(): S3_STRING_DTYPE}.get)
+                
+                print(f"Loaded {len(df)} records from {source_name}")
+                
+                if columns is None and ticker_prefix is None:
+                    # Cached day aggregates are kept sorted by ticker for
+                    # select_ticker_prefix; minute and trade rows keep file order
+                    if data_type == 'day_aggs_v1' and not df['ticker'].is_monotonic_increasing:
+                        df = df.sort_values('ticker', ignore_index=True)
+                    if cache_path is not None and not cache_path.exists():
+                        self._save_s3_day(df, cache_path)
+                    self._s3_cache[s3_key] = df
+                    while len(self._s3_cache) > S3_CACHE_SIZE:
+                        del self._s3_cache[next(iter(self._s3_cache))]
+                    return df
+                return df if columns is None else df[columns]
+                
+            except Exception as e:
+                if '403' in str(e) or 'ACCESS_DENIED' in str(e):
+                    print(f"Access denied for {data_type} - this data type may not be included in your subscription")
+                else:
+                    print(f"Error fetching S3 data: {e}")
+                return pd.DataFrame()
+    
+    @staticmethod
+    def _save_s3_day(df: pd.DataFrame, path: Path):
+        """Write a parsed day file to the Parquet cache (best effort)"""
+        # Write under a temporary name and rename, so a concurrent reader
+        # never sees a partially written file
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                           compression='snappy')
+            os.replace(tmp_path, path)
         except Exception as e:
-            if '403' in str(e):
-                print(f"Access denied for {data_type} - this data type may not be included in your subscription")
-            else:
-                print(f"Error fetching S3 data: {e}")
-            return pd.DataFrame()
+            # The day is already parsed, so a failed write only loses the disk copy
+            print(f"Could not cache S3 data on disk: {e}")
+            tmp_path.unlink(missing_ok=True)
     
     def get_stock_price(self, ticker: str, date: str) -> Optional[float]:
         """Get stock price for a given date"""
@@ -141,17 +395,15 @@ class PolygonOptionsAPI:
         cache_key = f"price_{ticker}_{date}"
         
         # Check if we already have this data cached
-        if not hasattr(self, '_price_cache'):
-            self._price_cache = {}
-        
         if cache_key in self._price_cache:
             return self._price_cache[cache_key]
         
         url = f"{self.base_url}/v2/aggs/ticker/{ticker}/range/1/day/{date}/{date}"
-        params = {'adjusted': 'true', 'apiKey': self.api_key}
+        params = {'adjusted': 'true'}
         
         try:
-            response = requests.get(url, params=params)
+            # Session keeps the connection alive between price lookups
+            response = self.session.get(url, params=params, timeout=HTTP_TIMEOUT)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('results'):
@@ -162,13 +414,29 @@ class PolygonOptionsAPI:
             print(f"Error fetching stock price: {e}")
         return None
     
+    def get_stock_prices(self, tickers: List[str], date: str, max_workers: int = HTTP_POOL_SIZE) -> Dict[str, Optional[float]]:
+        """
+        Get stock prices for several tickers at once
+        
+        Args:
+            tickers: Stock symbols
+            date: Date in YYYY-MM-DD format
+            max_workers: Maximum number of prices fetched concurrently (defaults
+                to the session's connection pool size per host)
+            
+        Returns:
+            Dictionary mapping each ticker to its closing price (None if unavailable)
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            prices = executor.map(lambda ticker: self.get_stock_price(ticker, date), tickers)
+            return dict(zip(tickers, prices))
+    
     def get_previous_close(self, ticker: str) -> Optional[float]:
         """Get previous day's closing price"""
         url = f"{self.base_url}/v2/aggs/ticker/{ticker}/prev"
-        params = {'apiKey': self.api_key}
         
         try:
-            response = requests.get(url, params=params)
+            response = self.session.get(url, timeout=HTTP_TIMEOUT)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('results'):
@@ -183,9 +451,6 @@ class PolygonOptionsAPI:
         cache_key = f"{ticker}_{as_of_date}"
         
         # Check if we already have this data cached
-        if not hasattr(self, '_expiration_cache'):
-            self._expiration_cache = {}
-        
         if cache_key in self._expiration_cache:
             return self._expiration_cache[cache_key]
         
@@ -204,8 +469,7 @@ class PolygonOptionsAPI:
             'expired': 'false',
             'limit': 1000,
             'order': 'asc',
-            'sort': 'expiration_date',
-            'apiKey': self.api_key
+            'sort': 'expiration_date'
         }
         
         expirations = set()
@@ -214,9 +478,9 @@ class PolygonOptionsAPI:
         while next_url and len(expirations) < 50:
             try:
                 if next_url == url:
-                    response = requests.get(next_url, params=params)
+                    response = self.session.get(next_url, params=params, timeout=HTTP_TIMEOUT)
                 else:
-                    response = requests.get(next_url)
+                    response = self.session.get(next_url, timeout=HTTP_TIMEOUT)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -224,12 +488,8 @@ class PolygonOptionsAPI:
                         expirations.add(contract['expiration_date'])
                     
                     next_url = data.get('next_url')
-                    if next_url:
-                        next_url += f"&apiKey={self.api_key}"
                 else:
                     break
-                    
-                time.sleep(0.1)
             except Exception as e:
                 print(f"Error fetching expirations: {e}")
                 break
@@ -249,29 +509,24 @@ class PolygonOptionsAPI:
             # Filter for options of this ticker
             # Options tickers start with O:TICKER
             ticker_prefix = f"O:{ticker}"
-            options_df = df[df['ticker'].str.startswith(ticker_prefix)]
+            options_df = select_ticker_prefix(df, ticker_prefix)
             
             if options_df.empty:
                 return []
             
-            # Extract expiration dates from option symbols
-            expirations = set()
-            for opt_ticker in options_df['ticker'].unique():
-                # Parse option symbol: O:AAPL240119C00175000
-                # Format: O:TICKER + YYMMDD + C/P + STRIKE*1000
-                parts = opt_ticker.replace(f"O:{ticker}", "")
-                if len(parts) >= 6:
-                    # Extract date part (YYMMDD)
-                    date_str = parts[:6]
-                    try:
-                        # Convert to YYYY-MM-DD format
-                        exp_date = datetime.strptime(date_str, "%y%m%d").strftime("%Y-%m-%d")
-                        if exp_date >= as_of_date:
-                            expirations.add(exp_date)
-                    except:
-                        continue
+            # Extract expiration dates from option symbols. The prefix also
+            # matches longer roots such as adjusted contracts, but only this
+            # root's symbols end in exactly YYMMDD + C/P + 8-digit strike
+            tails = pc.utf8_slice_codeunits(pa.array(options_df['ticker'], type=pa.string()),
+                                            len(ticker_prefix))
+            tails = tails.filter(pc.match_substring_regex(tails, r'^\d{6}[CP]\d{8}$'))
             
-            return sorted(list(expirations))
+            # A day holds thousands of contracts but only a few dozen expirations,
+            # so dedupe the date codes before converting them
+            date_codes = pc.unique(pc.utf8_slice_codeunits(tails, 0, 6)).to_pandas()
+            dates = pd.to_datetime(date_codes, format='%y%m%d', errors='coerce').dropna()
+            
+            return sorted(dates[dates >= as_of_date].dt.strftime('%Y-%m-%d').tolist())
         except Exception as e:
             print(f"Error getting expirations from S3: {e}")
             return []
@@ -286,14 +541,23 @@ class PolygonOptionsAPI:
             as_of_date: Historical date for the chain
             
         Returns:
-            DataFrame with complete option chain
+            DataFrame with complete option chain. Chains built from S3 are
+            cached; each call gets its own copy, so callers may modify it.
         """
         # For historical data, prioritize S3 (faster and more complete)
         if self.s3_client and as_of_date:
+            cache_key = (ticker, expiration, as_of_date)
+            # Single lookup - another thread may evict between 'in' and indexing
+            cached = self._chain_cache.get(cache_key)
+            if cached is not None:
+                return cached.copy()
+            
             try:
                 s3_data = self._get_option_chain_from_s3(ticker, expiration, as_of_date)
                 if not s3_data.empty:
-                    return s3_data
+                    chain = self._categorize_type(s3_data)
+                    self._cache_put(self._chain_cache, cache_key, chain)
+                    return chain.copy()
             except Exception as e:
                 print(f"S3 fetch failed, falling back to API: {e}")
         
@@ -305,7 +569,38 @@ class PolygonOptionsAPI:
             api_data = pd.DataFrame(columns=['ticker', 'type', 'strike', 'expiration', 
                                             'bid', 'ask', 'last', 'volume', 'open_interest'])
         
-        return api_data
+        return self._categorize_type(api_data)
+    
+    def _cache_put(self, cache: Dict, key, value):
+        """Add to a bounded cache, evicting the oldest entries past CHAIN_CACHE_SIZE"""
+        with self._cache_lock:
+            cache[key] = value
+            while len(cache) > CHAIN_CACHE_SIZE:
+                cache.pop(next(iter(cache)), None)
+    
+    @staticmethod
+    def _categorize_type(chain: pd.DataFrame) -> pd.DataFrame:
+        """Store the call/put column as a categorical so type filters compare small integer codes"""
+        chain['type'] = chain['type'].astype('category')
+        return chain
+    
+    def get_option_chains(self, ticker: str, expirations: List[str], as_of_date: Optional[str] = None,
+                          max_workers: int = 5) -> Dict[str, pd.DataFrame]:
+        """
+        Get option chains for several expirations at once
+        
+        Args:
+            ticker: Stock symbol
+            expirations: Expiration dates in YYYY-MM-DD format
+            as_of_date: Historical date for the chains
+            max_workers: Maximum number of chains fetched concurrently
+            
+        Returns:
+            Dictionary mapping each expiration to its option chain
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            chains = executor.map(lambda exp: self.get_option_chain(ticker, exp, as_of_date), expirations)
+            return dict(zip(expirations, chains))
     
     def _get_option_chain_from_s3(self, ticker: str, expiration: str, as_of_date: str) -> pd.DataFrame:
         """Get option chain from S3 flat files - optimized"""
@@ -319,11 +614,17 @@ class PolygonOptionsAPI:
             exp_date_str = datetime.strptime(expiration, "%Y-%m-%d").strftime("%y%m%d")
             ticker_exp_prefix = f"O:{ticker}{exp_date_str}"
             
-            options_aggs = aggs_df[aggs_df['ticker'].str.startswith(ticker_exp_prefix)].copy()
+            options_aggs = select_ticker_prefix(aggs_df, ticker_exp_prefix)
             
             if options_aggs.empty:
                 return pd.DataFrame()
             
+            # Bid/ask estimates for the whole expiration at once. assign returns a
+            # new frame, so the cached day file is never written to and the
+            # slice doesn't need a defensive copy first
+            bid, ask = estimate_bid_ask(options_aggs['close'].to_numpy(), options_aggs['volume'].to_numpy())
+            options_aggs = options_aggs.assign(bid=bid, ask=ask)
+            
             # Get stock price once for all calculations
             stock_price = self.get_stock_price(ticker, as_of_date) or 100
             
@@ -333,83 +634,58 @@ class PolygonOptionsAPI:
             dte = (exp_dt - as_of_dt).days
             T = max(dte / 365.0, 0.001)
             
-            # Parse option symbols and create structured data
-            parsed_options = []
+            # One anchored regex pass validates and splits every symbol. Only
+            # this root and date followed by exactly C/P + 8-digit strike * 1000
+            # matches; anything else isn't a contract of this expiration
+            fields = pc.extract_regex(pa.array(options_aggs['ticker'], type=pa.string()),
+                                      rf"^{re.escape(ticker_exp_prefix)}(?P<type>[CP])(?P<strike>\d{{8}})$")
+            valid = pc.is_valid(fields).to_numpy(zero_copy_only=False)
+            if not valid.any():
+                return pd.DataFrame()
+            fields = fields.filter(valid)
+            # Columns a day file doesn't carry (vwap) read as 0
+            aggs = options_aggs.reindex(index=options_aggs.index[valid], fill_value=0,
+                                        columns=['ticker', 'bid', 'ask', 'close', 'volume',
+                                                 'open', 'high', 'low', 'vwap'])
             
-            for _, row in options_aggs.iterrows():
-                opt_ticker = row['ticker']
-                parts = opt_ticker.replace(f"O:{ticker}", "")
-                
-                if len(parts) < 15:
-                    continue
-                
-                # Extract components
-                opt_type = 'call' if parts[6] == 'C' else 'put'
-                strike_str = parts[7:15]
-                
-                try:
-                    strike = float(strike_str) / 1000
-                except:
-                    continue
-                
-                # Use close price as last traded price
-                last_price = row.get('close', 0)
-                volume = row.get('volume', 0)
-                
-                # Simple bid/ask estimation based on volume
-                if last_price > 0:
-                    if volume > 1000:
-                        spread = 0.02  # 2% for liquid
-                    elif volume > 100:
-                        spread = 0.05  # 5% for semi-liquid  
-                    else:
-                        spread = 0.10  # 10% for illiquid
-                    
-                    half_spread = last_price * spread / 2
-                    bid = max(0.01, last_price - half_spread)
-                    ask = last_price + half_spread
-                else:
-                    bid = ask = 0
-                
-                # Simplified Greeks - only calculate for ITM/ATM options
-                moneyness = abs(strike - stock_price) / stock_price
-                
-                if last_price > 0 and T > 0 and moneyness < 0.2:  # Within 20% of ATM
-                    # Use simple IV estimate based on moneyness
-                    if moneyness < 0.05:  # ATM
-                        iv = 0.20
-                    else:  # Near ATM
-                        iv = 0.25
-                    
-                    # Quick Greeks calculation
-                    greeks = self.calculate_greeks(stock_price, strike, T, 0.05, iv, opt_type)
-                else:
-                    # Skip Greeks for far OTM options
-                    iv = 0.30
-                    greeks = {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0, 'rho': 0}
-                
-                option_data = {
-                    'ticker': opt_ticker,
-                    'type': opt_type,
-                    'strike': strike,
-                    'expiration': expiration,
-                    'bid': round(bid, 2),
-                    'ask': round(ask, 2),
-                    'last': last_price,
-                    'volume': int(volume),
-                    'open_interest': int(row.get('open', 0) * 100),  # Estimate
-                    'high': row.get('high', 0),
-                    'low': row.get('low', 0),
-                    'vwap': row.get('vwap', 0),
-                    'change': 0,
-                    'implied_volatility': round(iv, 4),
-                    **greeks,
-                    'data_source': 's3_flatfiles'
-                }
-                
-                parsed_options.append(option_data)
+            strike = pc.cast(fields.field('strike'), pa.int64()).to_numpy() / 1000
+            is_call = pc.equal(fields.field('type'), 'C').to_numpy(zero_copy_only=False)
+            # Use close price as last traded price
+            last_price = aggs['close'].to_numpy()
+            
+            # Simplified Greeks - only priced within 20% of ATM, with a simple IV
+            # estimate based on moneyness (ATM 20%, near ATM 25%, far OTM 30%)
+            moneyness = np.abs(strike - stock_price) / stock_price
+            priced = (last_price > 0) & (moneyness < 0.2)
+            iv = np.where(priced, np.where(moneyness < 0.05, 0.20, 0.25), 0.30)
+            
+            # Price every strike in one pass and zero the unpriced ones, rather
+            # than gathering the priced subset and scattering results back.
+            # Unpriced rows may be degenerate (e.g. a zero strike); their
+            # inf/nan results are masked out, so don't warn about them
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                greeks = {name: np.where(priced, values, 0.0) for name, values in
+                          calculate_greeks_vectorized(stock_price, strike, T, 0.05, iv, is_call).items()}
             
-            return pd.DataFrame(parsed_options)
+            return pd.DataFrame({
+                'ticker': aggs['ticker'].to_numpy(dtype=object),
+                'type': np.where(is_call, 'call', 'put').astype(object),
+                'strike': strike,
+                'expiration': expiration,
+                'bid': aggs['bid'].to_numpy(),
+                'ask': aggs['ask'].to_numpy(),
+                'last': last_price,
+                # Counts are whole contracts
+                'volume': aggs['volume'].to_numpy().astype('int64'),
+                'open_interest': (aggs['open'] * 100).to_numpy().astype('int64'),  # Estimate
+                'high': aggs['high'].to_numpy(),
+                'low': aggs['low'].to_numpy(),
+                'vwap': aggs['vwap'].to_numpy(),
+                'change': 0,
+                'implied_volatility': iv,
+                **greeks,
+                'data_source': 's3_flatfiles'
+            })
             
         except Exception as e:
             print(f"Error processing S3 option chain: {e}")
@@ -466,16 +742,26 @@ class PolygonOptionsAPI:
     
     def get_options_snapshot(self, ticker: str, timestamp: Optional[str] = None) -> Dict:
         """Get snapshot of all options for a ticker"""
+        # A snapshot covers every expiration, so each chain of a historical date
+        # reuses one response. Live snapshots (no timestamp) are never cached
+        cache_key = (ticker, timestamp)
+        cached = self._snapshot_cache.get(cache_key) if timestamp else None
+        if cached is not None:
+            return cached
+        
         url = f"{self.base_url}/v3/snapshot/options/{ticker}"
-        params = {'apiKey': self.api_key}
+        params = {}
         
         if timestamp:
             params['timestamp'] = timestamp
         
         try:
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params, timeout=HTTP_TIMEOUT)
             if response.status_code == 200:
-                return response.json()
+                data = response.json()
+                if timestamp:
+                    self._cache_put(self._snapshot_cache, cache_key, data)
+                return data
             else:
                 print(f"Error fetching snapshot: {response.status_code}")
         except Exception as e:
@@ -489,8 +775,7 @@ class PolygonOptionsAPI:
         params = {
             'underlying_ticker': ticker,
             'expiration_date': expiration,
-            'limit': 250,
-            'apiKey': self.api_key
+            'limit': 1000  # the endpoint's maximum, to keep the number of pages down
         }
         
         all_contracts = []
@@ -499,9 +784,9 @@ class PolygonOptionsAPI:
         while next_url:
             try:
                 if next_url == url:
-                    response = requests.get(next_url, params=params)
+                    response = self.session.get(next_url, params=params, timeout=HTTP_TIMEOUT)
                 else:
-                    response = requests.get(next_url)
+                    response = self.session.get(next_url, timeout=HTTP_TIMEOUT)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -526,8 +811,6 @@ class PolygonOptionsAPI:
                         })
                     
                     next_url = data.get('next_url')
-                    if next_url:
-                        next_url += f"&apiKey={self.api_key}"
                 else:
                     break
                     